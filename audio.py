@@ -2,8 +2,14 @@
 """
 
 import librosa
+import numba
 import numpy as np
 import scipy
+import soundfile as sf
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torchaudio
 
 import config as cfg
 
@@ -28,7 +34,14 @@ def _trim_silence(wav):
 def load_wav(wavpath):
     """Load the wav file from disk
     """
-    wav, _ = librosa.load(wavpath, sr=cfg.audio["sampling_rate"])
+    wav, sr = sf.read(wavpath, dtype="float32")
+
+    # Downmix to mono and resample (only if required)
+    if wav.ndim > 1:
+        wav = wav.mean(axis=1)
+    if sr != cfg.audio["sampling_rate"]:
+        wav = librosa.resample(wav, orig_sr=sr, target_sr=cfg.audio["sampling_rate"])
+
     wav = _trim_silence(wav)
     wav = _sound_norm(wav)
 
@@ -43,13 +56,41 @@ def save_wav(wav, wavpath):
     scipy.io.wavfile.write(wavpath, cfg.audio["sampling_rate"], wav_norm.astype(np.int16))
 
 
+# The numba kernels are single threaded, as they run inside the (one per CPU core) preprocessing worker processes
+@numba.njit(cache=True, fastmath=True)
+def _mu_compress_numba(wav, mu):
+    """Mu-law compress the signal and quantize it to [0, mu] (equivalent to librosa.mu_compress offset by (mu + 1) / 2)
+    """
+    qwav = np.empty(wav.shape[0], dtype=np.int64)
+    log1p_mu = np.log1p(mu)
+
+    for i in range(wav.shape[0]):
+        x = np.sign(wav[i]) * np.log1p(mu * np.abs(wav[i])) / log1p_mu
+        qwav[i] = np.int64(np.ceil((x + 1.0) * mu / 2.0))
+
+    return qwav
+
+
+@numba.njit(cache=True, fastmath=True)
+def _preemphasis_numba(wav, coef):
+    """Apply pre-emphasis to the signal i.e. y[n] = x[n] - coef * x[n - 1]
+    """
+    out = np.empty_like(wav)
+    out[0] = wav[0]
+
+    for i in range(1, wav.shape[0]):
+        out[i] = wav[i] - coef * wav[i - 1]
+
+    return out
+
+
 def mulaw_compression(wav):
     """Compress the waveform using mu-law compression
     """
     wav = np.pad(wav, (cfg.audio["win_length"] // 2,), mode="reflect")
     wav = wav[: ((wav.shape[0] - cfg.audio["win_length"]) // cfg.audio["hop_length"] + 1) * cfg.audio["hop_length"]]
 
-    wav = 2 ** (cfg.audio["n_bits"] - 1) + librosa.mu_compress(wav, mu=2 ** cfg.audio["n_bits"] - 1)
+    wav = _mu_compress_numba(wav, 2 ** cfg.audio["n_bits"] - 1)
 
     return wav
 
@@ -63,10 +104,11 @@ def inv_mulaw_compression(wav):
 
 
 def compute_melspectrogram(wav):
-    """Compute mel-spectrogram from waveform
+    """Compute mel-spectrogram from waveform (single waveform reference implementation, preprocessing uses the batched
+    MelSpectrogram and checks it against this function)
     """
     # Apply pre-emphasis
-    wav = librosa.effects.preemphasis(wav, coef=0.97)
+    wav = _preemphasis_numba(wav, 0.97)
 
     # Compute the mel spectrogram
     mel = librosa.feature.melspectrogram(
@@ -89,3 +131,64 @@ def compute_melspectrogram(wav):
     mel = mel / cfg.audio["max_db"]
 
     return mel
+
+
+class MelSpectrogram(nn.Module):
+    """Batched mel-spectrogram computation (runs on a batch of zero padded waveforms on the GPU, the mel-spectrogram of
+    each waveform matches the one computed by compute_melspectrogram)
+    """
+
+    def __init__(self):
+        """Instantiate the mel-spectrogram layer
+        """
+        super().__init__()
+
+        # Pre-emphasis filter (as a cross-correlation kernel i.e. y[n] = x[n] - 0.97 * x[n - 1])
+        self.register_buffer("preemphasis_filter", torch.FloatTensor([-0.97, 1.0]).view(1, 1, -1))
+
+        # Magnitude spectrogram (zero padded at the edges, same as librosa)
+        self.spectrogram = torchaudio.transforms.Spectrogram(
+            n_fft=cfg.audio["n_fft"],
+            win_length=cfg.audio["win_length"],
+            hop_length=cfg.audio["hop_length"],
+            pad_mode="constant",
+            power=1.0,
+        )
+
+        # Use the librosa mel filterbank so that the features match those computed by compute_melspectrogram
+        mel_basis = librosa.filters.mel(
+            sr=cfg.audio["sampling_rate"],
+            n_fft=cfg.audio["n_fft"],
+            n_mels=cfg.audio["n_mels"],
+            fmin=cfg.audio["fmin"],
+            norm=1,
+        )
+        self.register_buffer("mel_basis", torch.FloatTensor(mel_basis))
+
+    def forward(self, wavs, wav_lengths):
+        """Forward pass
+
+            Shapes:
+                wavs: [B, T]
+                wav_lengths: [B]
+                returns: [B, n_mels, T // hop_length + 1]
+        """
+        # Apply pre-emphasis
+        wavs = F.conv1d(F.pad(wavs.unsqueeze(1), (1, 0)), self.preemphasis_filter).squeeze(1)
+
+        # Pre-emphasis leaks the last sample of each waveform into its padding, zero the padding again so that the
+        # mel-spectrogram of each waveform does not depend on the batch it is in
+        padding_mask = torch.arange(wavs.size(-1), device=wavs.device).unsqueeze(0) >= wav_lengths.unsqueeze(1)
+        wavs = wavs.masked_fill(padding_mask, 0.0)
+
+        # Compute the mel spectrogram
+        mels = torch.matmul(self.mel_basis, self.spectrogram(wavs))
+
+        # Convert to log scale
+        mels = 20 * torch.log10(mels.clamp_min(1e-5)) - cfg.audio["ref_db"]
+
+        # Normalize
+        mels = mels.clamp_min(-cfg.audio["max_db"])
+        mels = mels / cfg.audio["max_db"]
+
+        return mels
@@ -1,50 +1,61 @@
 """Preprocess dataset and split into train/val/test splits"""
 
 import argparse
+import multiprocessing
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-import librosa
+import h5py
 import numpy as np
+import torch
+from torch.nn.utils.rnn import pad_sequence
+from tqdm import tqdm
 
 import config as cfg
-from audio import compute_melspectrogram, load_wav, mulaw_compression
+from audio import MelSpectrogram, compute_melspectrogram, load_wav, mulaw_compression
 
 
 def _split_dataset(items):
     """Split the dataset items into train/val/test splits
     """
-    np.random.seed(1234)
+    rng = np.random.default_rng(1234)
 
     split_size = int(len(items) * 0.01)
 
-    np.random.shuffle(items)
-    train_val_split = items[split_size:]
-    test_split = items[:split_size]
+    # Shuffle the indices of the items (rather than the items themselves)
+    indices = rng.permutation(len(items))
 
-    np.random.shuffle(train_val_split)
-    train_split = train_val_split[split_size:]
-    val_split = train_val_split[:split_size]
+    test_split = [items[i] for i in indices[:split_size]]
+    val_split = [items[i] for i in indices[split_size : 2 * split_size]]
+    train_split = [items[i] for i in indices[2 * split_size :]]
 
     return train_split, val_split, test_split
 
 
-def _process_wav(wav, filename, mel_dir, qwav_dir):
-    """Process a single wav file
+@torch.no_grad()
+def _process_batch(batch, melspectrogram, device):
+    """Compute the mel spectrograms for a batch of wav files in a single pass
     """
-    # Compute mel spectrogram
-    mel = compute_melspectrogram(wav)
+    filenames, texts, wavs, qwavs = zip(*batch)
 
-    # Quantize the wavform
-    qwav = mulaw_compression(wav)
+    # Pad the wavs in the batch and compute the mel spectrograms
+    wav_lengths = [len(wav) for wav in wavs]
+    wavs = pad_sequence([torch.FloatTensor(wav) for wav in wavs], batch_first=True)
+    mels = melspectrogram(wavs.to(device), torch.LongTensor(wav_lengths).to(device)).cpu().numpy()
 
-    # Save to disk
-    mel_path = os.path.join(mel_dir, filename + ".npy")
-    qwav_path = os.path.join(qwav_dir, filename + ".npy")
+    # Discard the frames corresponding to the padding
+    mels = [mel[:, : wav_length // cfg.audio["hop_length"] + 1] for mel, wav_length in zip(mels, wav_lengths)]
 
-    np.save(mel_path, mel)
-    np.save(qwav_path, qwav)
+    return list(zip(filenames, texts, mels, qwavs))
 
-    return mel.shape[-1]
+
+def _check_batch(batch, processed_batch):
+    """Check that the batched mel spectrograms match the mel spectrograms computed for each wav on its own
+    """
+    for (filename, _, wav, _), (_, _, mel, _) in zip(batch, processed_batch):
+        if not np.allclose(mel, compute_melspectrogram(wav), atol=1e-3):
+            raise ValueError(f"Batched mel spectrogram of {filename} does not match compute_melspectrogram")
 
 
 def write_metadata(metadata, out_file):
@@ -55,20 +66,86 @@ def write_metadata(metadata, out_file):
             file_writer.write("|".join([str(x) for x in m]) + "\n")
 
 
-def process_dataset_split(items, mel_dir, qwav_dir):
-    """Process the dataset split
+def _process_one(item):
+    """Load and quantize a single wav file (runs in a worker process)
+    """
+    text, wav_path = item
+
+    # Get filename being processed
+    filename = os.path.splitext(os.path.basename(wav_path))[0]
+
+    # Load wav file from disk
+    wav = load_wav(wav_path)
+
+    # Quantize the wavform (and store it as unsigned 16 bit integers, n_bits <= 16)
+    qwav = mulaw_compression(wav).astype(np.uint16)
+
+    return filename, text, wav, qwav
+
+
+def _process_items(executor, items, max_in_flight):
+    """Process the items in the worker pool, with at most max_in_flight items submitted at any time (so that finished
+    results do not pile up in memory when the consumer falls behind). The results are yielded in the order of the items
     """
+    futures = deque()
+    for item in items:
+        futures.append(executor.submit(_process_one, item))
+        if len(futures) == max_in_flight:
+            yield futures.popleft().result()
+
+    while futures:
+        yield futures.popleft().result()
+
+
+def _batches(results, batch_size):
+    """Group the results into batches of batch_size
+    """
+    batch = []
+    for result in results:
+        batch.append(result)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def process_dataset_split(items, split_dir, executor, batch_size=32):
+    """Process the dataset split. The wav files are loaded and quantized in parallel across all CPU cores, while the
+    mel spectrograms are computed in batches (on the GPU if available). The mel spectrograms (flattened) and quantized
+    wavs of all the items are written to a single HDF5 file (data.h5), row i of which corresponds to line i of the
+    metadata
+    """
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    melspectrogram = MelSpectrogram().to(device)
+
+    # Sort the items by (file size) length, so that each batch consists of wavs of similar lengths
+    items = sorted(items, key=lambda item: os.path.getsize(item[1]))
+
     metadata = []
-    for text, wav_path in items:
-        # Get filename being processed
-        filename = os.path.splitext(os.path.basename(wav_path))[0]
 
-        # Load wav file from disk
-        wav = load_wav(wav_path)
+    with h5py.File(os.path.join(split_dir, "data.h5"), "w", libver="latest") as data_writer:
+        # Store the mels at half precision and the quantized wavs as unsigned 16 bit integers
+        mel_writer = data_writer.create_dataset("mel", (len(items),), dtype=h5py.vlen_dtype(np.float16))
+        qwav_writer = data_writer.create_dataset("qwav", (len(items),), dtype=h5py.vlen_dtype(np.uint16))
+
+        # Keep a few batches worth of items (and at least two per worker) in flight
+        max_in_flight = max(4 * batch_size, 2 * os.cpu_count())
+        results = tqdm(_process_items(executor, items, max_in_flight), total=len(items))
 
-        # Process the wav file
-        num_frames = _process_wav(wav, filename, mel_dir, qwav_dir)
-        metadata.append((filename, text, num_frames))
+        for batch_idx, batch in enumerate(_batches(results, batch_size)):
+            processed_batch = _process_batch(batch, melspectrogram, device)
+
+            # Sanity check the batched mel spectrogram computation (on the first batch of the split)
+            if batch_idx == 0:
+                _check_batch(batch, processed_batch)
+
+            for filename, text, mel, qwav in processed_batch:
+                mel_writer[len(metadata)] = mel.astype(np.float16).ravel()
+                qwav_writer[len(metadata)] = qwav
+
+                metadata.append((filename, text, mel.shape[-1]))
 
     return metadata
 
@@ -88,29 +165,26 @@ def preprocess_dataset(root_dir, out_dir):
     # Split into train/val/test sets
     train_items, val_items, test_items = _split_dataset(items)
 
-    # Process the train split
-    print("Processing train split")
-
-    train_mel_dir = os.path.join(out_dir, "train", "mel")
-    train_qwav_dir = os.path.join(out_dir, "train", "qwav")
-
-    os.makedirs(train_mel_dir, exist_ok=True)
-    os.makedirs(train_qwav_dir, exist_ok=True)
+    # Pool of worker processes shared by the train and val splits. The workers are spawned (rather than forked), so that
+    # they never inherit the CUDA context of the main process
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")) as executor:
+        # Process the train split
+        print("Processing train split")
 
-    train_metadata = process_dataset_split(train_items, train_mel_dir, train_qwav_dir)
-    write_metadata(train_metadata, os.path.join(out_dir, "train/metadata.csv"))
+        train_dir = os.path.join(out_dir, "train")
+        os.makedirs(train_dir, exist_ok=True)
 
-    # Process the val split
-    print("Processing val split")
+        train_metadata = process_dataset_split(train_items, train_dir, executor)
+        write_metadata(train_metadata, os.path.join(out_dir, "train/metadata.csv"))
 
-    val_mel_dir = os.path.join(out_dir, "val", "mel")
-    val_qwav_dir = os.path.join(out_dir, "val", "qwav")
+        # Process the val split
+        print("Processing val split")
 
-    os.makedirs(val_mel_dir, exist_ok=True)
-    os.makedirs(val_qwav_dir, exist_ok=True)
+        val_dir = os.path.join(out_dir, "val")
+        os.makedirs(val_dir, exist_ok=True)
 
-    val_metadata = process_dataset_split(val_items, val_mel_dir, val_qwav_dir)
-    write_metadata(val_metadata, os.path.join(out_dir, "val/metadata.csv"))
+        val_metadata = process_dataset_split(val_items, val_dir, executor)
+        write_metadata(val_metadata, os.path.join(out_dir, "val/metadata.csv"))
 
     # Process the test split
     print("Processing test split")
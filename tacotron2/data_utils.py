@@ -3,6 +3,8 @@
 import math
 import os
 
+import config as cfg
+import h5py
 import numpy as np
 import torch
 import torch.nn.functional as F
@@ -22,11 +24,9 @@ def _load_dataset_instances(data_dir):
 
     dataset_instances = [instance.split("|") for instance in dataset_instances]
 
-    data_instances = [
-        [os.path.join(data_dir, "mel", instance[0] + ".npy"), instance[1]] for instance in dataset_instances
-    ]
+    data_instances = [[int(instance[2]), instance[1]] for instance in dataset_instances]
 
-    instance_lengths = [instance[2] for instance in dataset_instances]
+    instance_lengths = [int(instance[2]) for instance in dataset_instances]
 
     return data_instances, instance_lengths
 
@@ -92,20 +92,28 @@ class TextMelDataset(Dataset):
     def __init__(self, data_dir, reduction_factor):
         """Instantiate the dataset class
         """
+        self.data_dir = data_dir
         self.reduction_factor = reduction_factor
+        self.n_mels = cfg.audio["n_mels"]
         self.instances, self.lengths = _load_dataset_instances(data_dir)
         self.cmudict = load_cmudict()
 
+        # The HDF5 file is opened on first access (so that each dataloader worker opens its own file handle)
+        self.data = None
+
     def __len__(self):
         return len(self.instances)
 
     def __getitem__(self, idx):
-        melpath, text = self.instances[idx][0], self.instances[idx][1]
+        if self.data is None:
+            self.data = h5py.File(os.path.join(self.data_dir, "data.h5"), "r")
+
+        num_frames, text = self.instances[idx]
 
-        mel = np.load(melpath)
+        mel = self.data["mel"][idx].reshape(self.n_mels, num_frames)
         text_seq = text_to_sequence(text, self.cmudict)
 
-        return (torch.LongTensor(text_seq), torch.FloatTensor(mel).transpose_(0, 1).contiguous())
+        return (torch.LongTensor(text_seq), torch.from_numpy(mel.astype(np.float32)).transpose_(0, 1).contiguous())
 
     def sort_key(self, idx):
         return self.lengths[idx]
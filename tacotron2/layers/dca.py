@@ -42,11 +42,16 @@ class DynamicConvolutionAttention(nn.Module):
         self.n_dynamic_filters = n_dynamic_filters
         self.dynamic_filter_size = dynamic_filter_size
 
+        # Paddings used at every decoder step (causal for the prior filter, same padding for the dynamic filters)
+        self.prior_filter_padding = (prior_filter_len - 1, 0)
+        self.dynamic_filter_padding = (dynamic_filter_size - 1) // 2
+
         self.attention_weights = None
+        self.static_filter_weight = None
 
-        # Prior filter
+        # Prior filter (flipped once here, so that it can be applied as a dot product over sliding windows in forward)
         prior_filter = betabinom.pmf(np.arange(prior_filter_len), prior_filter_len - 1, alpha, beta)
-        self.register_buffer("prior_filter", torch.FloatTensor(prior_filter).flip(0))
+        self.register_buffer("prior_filter", torch.FloatTensor(prior_filter).flip(0).contiguous())
 
         # Key and Query layers
         self.W = nn.Linear(query_dim, attn_dim)
@@ -72,6 +77,10 @@ class DynamicConvolutionAttention(nn.Module):
         self.attention_weights = torch.zeros([B, T_enc], device=memory.device)
         self.attention_weights[:, 0] = 1.0
 
+        # The static filter computation (F) and the static filter layer (U) are both linear, so they are fused into a
+        # single convolution with attn_dim output channels (computed once per sequence, rather than at every step)
+        self.static_filter_weight = torch.einsum("ac,cok->aok", self.U.weight, self.F.weight)
+
     def forward(self, query, memory):
         """Forward pass
 
@@ -80,11 +89,9 @@ class DynamicConvolutionAttention(nn.Module):
                 memory: [B, T_enc, memory_dim]
                 returns: [B, memory_dim]
         """
-        # Compute prior filters
-        p = F.conv1d(
-            F.pad(self.attention_weights.unsqueeze(1), (self.prior_filter_len - 1, 0)), self.prior_filter.view(1, 1, -1)
-        )
-        p = torch.log(p.clamp_min_(1e-6)).squeeze(1)
+        # Compute prior filters (as a dot product of the prior filter with sliding windows over the attention weights)
+        p = F.pad(self.attention_weights, self.prior_filter_padding).unfold(-1, self.prior_filter_len, 1)
+        p = torch.matmul(p, self.prior_filter).clamp_min_(1e-6).log_()
 
         G = self.V(torch.tanh(self.W(query)))
 
@@ -92,16 +99,16 @@ class DynamicConvolutionAttention(nn.Module):
         g = F.conv1d(
             self.attention_weights.unsqueeze(0),
             G.view(-1, 1, self.dynamic_filter_size),
-            padding=(self.dynamic_filter_size - 1) // 2,
+            padding=self.dynamic_filter_padding,
             groups=query.size(0),
         )
-        g = g.view(query.size(0), self.n_dynamic_filters, -1).transpose(1, 2).contiguous()
+        g = g.view(query.size(0), self.n_dynamic_filters, -1).transpose(1, 2)
 
-        # Compute static filters
-        f = self.F(self.attention_weights.unsqueeze(1)).transpose(1, 2).contiguous()
+        # Compute static filters (already projected to attn_dim i.e. U(F(attention_weights)))
+        f = F.conv1d(self.attention_weights.unsqueeze(1), self.static_filter_weight, padding=self.F.padding)
 
         # Compute attention weights (normalized energies)
-        energy = self.v(torch.tanh(self.U(f) + self.T(g))).squeeze(-1) + p
+        energy = self.v(torch.tanh(f.transpose(1, 2) + self.T(g))).squeeze(-1) + p
         attention_weights = F.softmax(energy, dim=-1)
         self.attention_weights = attention_weights
 
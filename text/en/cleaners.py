@@ -12,10 +12,9 @@ _whitespace_re = re.compile(r"\s+")
 parentheses_pattern = re.compile(r"(?<=[.,!?] )[\(\[]|[\)\]](?=[.,!?])|^[\(\[]|[\)\]]$")
 dash_pattern = re.compile(r"(?<=[.,!?] )-- ")
 
-# List of (regular expression, replacement) pairs for abbreviations:
-_abbreviations = [
-    (re.compile("\\b%s\\." % x[0], re.IGNORECASE), x[1])
-    for x in [
+# Mapping from abbreviations to their expansions:
+_abbreviations = dict(
+    [
         ("mrs", "misess"),
         ("mr", "mister"),
         ("dr", "doctor"),
@@ -35,13 +34,18 @@ _abbreviations = [
         ("col", "colonel"),
         ("ft", "fort"),
     ]
-]
+)
+
+# Regular expression matching all the abbreviations (in a single pass):
+_abbreviations_re = re.compile(r"\b(%s)\." % "|".join(map(re.escape, _abbreviations)), re.IGNORECASE)
+
+
+def _expand_abbreviation(m):
+    return _abbreviations[m.group(1).lower()]
 
 
 def expand_abbreviations(text):
-    for regex, replacement in _abbreviations:
-        text = re.sub(regex, replacement, text)
-    return text
+    return _abbreviations_re.sub(_expand_abbreviation, text)
 
 
 def expand_numbers(text):
@@ -49,7 +53,7 @@ def expand_numbers(text):
 
 
 def collapse_whitespace(text):
-    return re.sub(_whitespace_re, " ", text)
+    return _whitespace_re.sub(" ", text)
 
 
 def convert_to_ascii(text):
@@ -64,11 +64,11 @@ def _expand_number(m):
 def normalize_numbers(text):
     """Normalize numerical quantities in the text
     """
-    text = re.sub(_comma_number_re, _remove_commas, text)
-    text = re.sub(_pounds_re, r"\1 pounds", text)
-    text = re.sub(_dollars_re, _expand_dollars, text)
-    text = re.sub(_decimal_number_re, _expand_decimal_point, text)
-    text = re.sub(_ordinal_re, _expand_ordinal, text)
-    text = re.sub(_number_re, _expand_number, text)
+    text = _comma_number_re.sub(_remove_commas, text)
+    text = _pounds_re.sub(r"\1 pounds", text)
+    text = _dollars_re.sub(_expand_dollars, text)
+    text = _decimal_number_re.sub(_expand_decimal_point, text)
+    text = _ordinal_re.sub(_expand_ordinal, text)
+    text = _number_re.sub(_expand_number, text)
 
     return text
@@ -1,7 +1,7 @@
 """Text processor for English"""
 
+import functools
 import re
-from itertools import islice
 
 from text.en.cleaners import clean_text
 
@@ -105,16 +105,18 @@ symbols = [_pad, _bos, _eos, _wb, _unk] + list(_punctuation) + list(_english_cha
 
 symbol_to_id = {symb: index for index, symb in enumerate(symbols)}
 
+# Lookup table mapping (ASCII) characters to their symbol IDs, used to convert OOV words to IDs in a single pass
+_char_to_id = bytearray([symbol_to_id[_unk]] * 256)
+for char in _punctuation + _english_characters:
+    _char_to_id[ord(char)] = symbol_to_id[char]
+_char_to_id = bytes(_char_to_id)
+
 # Regular expression for tokenizing text
 tokenizer_pattern = re.compile(r"[\w\{\}']+|[!-_/'(),.:;?\"]")
 # tokenizer_pattern = re.compile(rf"(\s*[{re.escape(_punctuation)}]+\s*)+")
 
-# Regular expression for dealing with alternate pronunciations in CMUDict
-alt_entry_pattern = re.compile(r"(?<=\w)\((\d)\)")
-
-
-def format_alt_entry(text):
-    return alt_entry_pattern.sub(r"{\1}", text)
+# Regular expression matching the CMUDict entries (word, alternate pronunciation number and pronunciation)
+cmudict_entry_pattern = re.compile(r"^([A-Z][^\s(]*)(?:\((\d)\))?  (.+?)\s*$", re.MULTILINE)
 
 
 def tokenize_text(text):
@@ -125,46 +127,44 @@ def load_cmudict():
     """Load the CMU pronunciation dictionary
     """
     with open("text/en/cmudict-0.7b.txt", encoding="ISO-8859-1") as file_reader:
-        cmudict = (line.strip().split("  ") for line in islice(file_reader, 126, 133905))
+        data = file_reader.read()
 
-        cmudict = {format_alt_entry(word): pronunciation for word, pronunciation in cmudict}
+    # Alternate pronunciations of a word are stored as WORD{N}
+    cmudict = {
+        (word if alt is None else f"{word}{{{alt}}}"): pronunciation
+        for word, alt, pronunciation in (m.groups() for m in cmudict_entry_pattern.finditer(data))
+    }
 
     return cmudict
 
 
-def parse_text(text, cmudict):
-    """Parse the text to get the sequence of phonemes for words in the CMUDict. For OOV words backoff to character
-    sequence instead of phoneme sequence
-    """
-    text_seq = []
-
-    # Normalize the text
-    text = tokenize_text(clean_text(text))
+@functools.lru_cache(maxsize=200_000)
+def _arpabet_to_sequence(pronunciation):
+    # Cached, as the same (CMUDict) pronunciations are converted over and over again across training epochs
+    return tuple(symbol_to_id.get("@" + s, symbol_to_id[_unk]) for s in pronunciation.split(" "))
 
-    # Get the sequence of phonemes for words in the text while explicitly marking word boundaries. Incase of OOV words
-    # backoff to using character sequence
-    for word in text:
-        if word.upper() in cmudict:
-            text_seq.append(" ".join(["@" + s for s in cmudict[word.upper()].split(" ")]))
-        else:
-            text_seq.append(" ".join(char for char in word))
 
-        text_seq.append(_wb)
+def _chars_to_sequence(word):
+    # The text is converted to ASCII by clean_text, so every character has an entry in the lookup table
+    return list(word.encode("ascii").translate(_char_to_id))
 
-    text_seq = [word.split(" ") for word in text_seq]
-    text_seq = [char for word in text_seq for char in word]
 
-    # Insert _bos and _eos symbols
-    text_seq.insert(0, _bos)
-    text_seq.append(_eos)
+def text_to_sequence(text, cmudict):
+    """Convert the text to a sequence of IDs corresponding to the symbols present in the text. Words in the CMUDict are
+    converted to their sequence of phonemes, while OOV words backoff to their character sequence
+    """
+    id_seq = [symbol_to_id[_bos]]
 
-    return text_seq
+    # Normalize the text, and get the sequence of IDs for words in the text while explicitly marking word boundaries
+    for word in tokenize_text(clean_text(text)):
+        pronunciation = cmudict.get(word.upper())
+        if pronunciation is not None:
+            id_seq.extend(_arpabet_to_sequence(pronunciation))
+        else:
+            id_seq.extend(_chars_to_sequence(word))
 
+        id_seq.append(symbol_to_id[_wb])
 
-def text_to_sequence(text, cmudict):
-    """Convert the text to a sequence of IDs corresponding to the symbols present in the text
-    """
-    text_seq = parse_text(text, cmudict)
-    id_seq = [symbol_to_id[s] if s in symbol_to_id else symbol_to_id[_unk] for s in text_seq]
+    id_seq.append(symbol_to_id[_eos])
 
     return id_seq
@@ -1,6 +1,7 @@
 """Train the Tacotron2 model"""
 
 import argparse
+import io
 import os
 import random
 
@@ -33,7 +34,11 @@ def save_checkpoint(checkpoint_dir, model, optimizer, scaler, scheduler, step):
 
     checkpoint_path = os.path.join(checkpoint_dir, f"model_step{step:09d}.pth")
 
-    torch.save(checkpoint_state, checkpoint_path)
+    # Serialize the checkpoint in memory and write it to disk in a single call
+    buffer = io.BytesIO()
+    torch.save(checkpoint_state, buffer)
+    with open(checkpoint_path, "wb") as file_writer:
+        file_writer.write(buffer.getbuffer())
 
     print(f"Written checkpoint: {checkpoint_path} to disk")
 
@@ -139,6 +144,10 @@ def train_model(data_dir, checkpoint_dir, alignment_dir, resume_checkpoint_path)
     torch.manual_seed(1234)
     torch.cuda.manual_seed(1234)
 
+    # Enable TF32 matmuls/convolutions (on Ampere and newer GPUs)
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+
     # Create directories
     os.makedirs(checkpoint_dir, exist_ok=True)
     os.makedirs(alignment_dir, exist_ok=True)
@@ -151,7 +160,7 @@ def train_model(data_dir, checkpoint_dir, alignment_dir, resume_checkpoint_path)
     model = model.to(device)
 
     # Instantiate the optimizer, scaler (for mixed precision training) and scheduler (for learning rate decay)
-    optimizer = torch.optim.Adam(model.parameters(), lr=cfg.tts_training["lr"])
+    optimizer = torch.optim.Adam(model.parameters(), lr=cfg.tts_training["lr"], fused=device.type == "cuda")
     scaler = amp.GradScaler()
     scheduler = torch.optim.lr_scheduler.MultiStepLR(
         optimizer=optimizer,
@@ -179,7 +188,7 @@ def train_model(data_dir, checkpoint_dir, alignment_dir, resume_checkpoint_path)
         for _, (texts, _, mels, _) in enumerate(train_dataloader, 1):
             texts, mels = texts.to(device), mels.to(device)
 
-            model.zero_grad()
+            optimizer.zero_grad(set_to_none=True)
 
             # Forward pass and loss computation
             with amp.autocast():
@@ -1,6 +1,7 @@
 """Train the WaveRNN model"""
 
 import argparse
+import io
 import os
 
 import torch
@@ -27,7 +28,11 @@ def save_checkpoint(checkpoint_dir, model, optimizer, scaler, scheduler, step):
 
     checkpoint_path = os.path.join(checkpoint_dir, f"model_step{step:09d}.pth")
 
-    torch.save(checkpoint_state, checkpoint_path)
+    # Serialize the checkpoint in memory and write it to disk in a single call
+    buffer = io.BytesIO()
+    torch.save(checkpoint_state, buffer)
+    with open(checkpoint_path, "wb") as file_writer:
+        file_writer.write(buffer.getbuffer())
 
     print(f"Written checkpoint: {checkpoint_path} to disk")
 
@@ -49,19 +54,28 @@ def load_checkpoint(checkpoint_path, model, optimizer, scaler, scheduler):
 def prepare_dataloaders(data_dir):
     """Prepare the dataloaders
     """
+    num_workers = min(8, os.cpu_count())
+
     train_dataset = WaveRNNDataset(os.path.join(data_dir, "train"))
     train_dataloader = DataLoader(
         dataset=train_dataset,
         batch_size=cfg.vocoder_training["batch_size"],
         shuffle=True,
-        num_workers=1,
-        pin_memory=False,
+        num_workers=num_workers,
+        pin_memory=True,
         drop_last=True,
+        persistent_workers=True,
+        prefetch_factor=4,
     )
 
     val_dataset = WaveRNNDataset(os.path.join(data_dir, "val"))
     val_dataloader = DataLoader(
-        dataset=val_dataset, batch_size=8, shuffle=False, num_workers=1, pin_memory=False, drop_last=True
+        dataset=val_dataset,
+        batch_size=8,
+        shuffle=False,
+        num_workers=1,
+        pin_memory=True,
+        drop_last=True,
     )
 
     return train_dataloader, val_dataloader
@@ -74,10 +88,10 @@ def validate(model, device, val_dataloader):
     with torch.no_grad():
         val_loss = 0.0
         for idx, (mels, qwavs) in enumerate(val_dataloader, 1):
-            mels, qwavs = mels.to(device), qwavs.to(device)
+            mels, qwavs = mels.to(device, non_blocking=True).float(), qwavs.to(device, non_blocking=True)
 
             wav_hat = model(qwavs[:, :-1], mels)
-            loss = F.cross_entropy(wav_hat.transpose(1, 2).contiguous(), qwavs[:, 1:])
+            loss = F.cross_entropy(wav_hat.transpose(1, 2), qwavs[:, 1:])
 
             val_loss += loss.item()
         val_loss = val_loss / (idx + 1)
@@ -92,18 +106,25 @@ def train_model(data_dir, checkpoint_dir, resume_checkpoint_path=None):
     torch.manual_seed(1234)
     torch.cuda.manual_seed(1234)
 
+    # Enable TF32 matmuls/convolutions (on Ampere and newer GPUs), and let cuDNN pick the fastest algorithms for the
+    # (fixed size) training batches
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    torch.backends.cudnn.benchmark = True
+
     # Create directories
     os.makedirs(checkpoint_dir, exist_ok=True)
 
     # Specify the device on which to perform the training
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-    # Instantiate the model
+    # Instantiate the model (the training loop uses the compiled model, while checkpoints are written from the original)
     model = WaveRNNModel()
     model = model.to(device)
+    compiled_model = torch.compile(model, mode="max-autotune")
 
     # Instantiate the optimizer, scaler (for mixed precision training) and scheduler (for learning rate decay)
-    optimizer = optim.Adam(model.parameters(), lr=cfg.vocoder_training["lr"])
+    optimizer = optim.Adam(model.parameters(), lr=cfg.vocoder_training["lr"], fused=device.type == "cuda")
     scaler = amp.GradScaler()
     scheduler = optim.lr_scheduler.StepLR(
         optimizer=optimizer,
@@ -129,14 +150,14 @@ def train_model(data_dir, checkpoint_dir, resume_checkpoint_path=None):
     for epoch in range(start_epoch, n_epochs + 1):
         print(f"Epoch: {epoch}", flush=True)
         for _, (mels, qwavs) in enumerate(train_dataloader, 1):
-            mels, qwavs = mels.to(device), qwavs.to(device)
+            mels, qwavs = mels.to(device, non_blocking=True).float(), qwavs.to(device, non_blocking=True)
 
-            model.zero_grad()
+            optimizer.zero_grad(set_to_none=True)
 
             # Forward pass and loss computation
             with amp.autocast():
-                wav_hat = model(qwavs[:, :-1], mels)
-                loss = F.cross_entropy(wav_hat.transpose(1, 2).contiguous(), qwavs[:, 1:])
+                wav_hat = compiled_model(qwavs[:, :-1], mels)
+                loss = F.cross_entropy(wav_hat.transpose(1, 2), qwavs[:, 1:])
 
             # Gradient computation
             scaler.scale(loss).backward()
@@ -157,7 +178,7 @@ def train_model(data_dir, checkpoint_dir, resume_checkpoint_path=None):
             )
 
             if global_step % cfg.vocoder_training["checkpoint_interval"] == 0:
-                validate(model, device, val_dataloader)
+                validate(compiled_model, device, val_dataloader)
                 save_checkpoint(checkpoint_dir, model, optimizer, scaler, scheduler, global_step)
 
 
@@ -4,13 +4,14 @@ import os
 import random
 
 import config as cfg
+import h5py
 import numpy as np
 import torch
 from torch.utils.data import Dataset
 
 
 def _load_dataset_instances(data_dir):
-    """Load the training instances from disk
+    """Load the training instances from disk (number of mel frames of each instance)
     """
     with open(os.path.join(data_dir, "metadata.csv"), "r") as file_reader:
         dataset_instances = file_reader.readlines()
@@ -19,10 +20,7 @@ def _load_dataset_instances(data_dir):
 
     dataset_instances = [instance.split("|") for instance in dataset_instances]
 
-    dataset_instances = [
-        [os.path.join(data_dir, "mel", instance[0] + ".npy"), os.path.join(data_dir, "qwav", instance[0] + ".npy")]
-        for instance in dataset_instances
-    ]
+    dataset_instances = [int(instance[2]) for instance in dataset_instances]
 
     return dataset_instances
 
@@ -34,19 +32,27 @@ class WaveRNNDataset(Dataset):
     def __init__(self, data_dir):
         """Instantiate the dataset
         """
+        self.data_dir = data_dir
         self.dataset_instances = _load_dataset_instances(data_dir)
 
         self.sample_frames = cfg.vocoder_training["sample_frames"]
         self.hop_length = cfg.audio["hop_length"]
+        self.n_mels = cfg.audio["n_mels"]
+
+        # The HDF5 file is opened on first access (so that each dataloader worker opens its own file handle)
+        self.data = None
 
     def __len__(self):
         return len(self.dataset_instances)
 
     def __getitem__(self, index):
-        mel_path, qwav_path = self.dataset_instances[index]
+        if self.data is None:
+            self.data = h5py.File(os.path.join(self.data_dir, "data.h5"), "r")
+
+        num_frames = self.dataset_instances[index]
 
-        mel = np.load(mel_path)
-        qwav = np.load(qwav_path)
+        mel = self.data["mel"][index].reshape(self.n_mels, num_frames)
+        qwav = self.data["qwav"][index]
 
         pos = random.randint(0, mel.shape[-1] - self.sample_frames - 1)
         mel = mel[:, pos : pos + self.sample_frames]
@@ -54,4 +60,5 @@ class WaveRNNDataset(Dataset):
         p, q = pos, pos + self.sample_frames
         qwav = qwav[p * self.hop_length : q * self.hop_length + 1]
 
-        return torch.FloatTensor(mel.T), torch.LongTensor(qwav)
+        # The mels are returned at half precision (and converted to full precision once they are on the GPU)
+        return torch.from_numpy(np.ascontiguousarray(mel.T)), torch.from_numpy(qwav.astype(np.int64))